@@ -0,0 +1,43 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+
+@dataclass(frozen=True)
+class AppSettings:
+    """
+    Application settings read from the environment and the .env file.
+    """
+    openai_api_key: str
+    openai_model: str
+    qdrant_host: str
+    qdrant_api_key: str
+    collection_name: str
+    pdf_path: str
+    pdf_folder: str
+    vector_size: int
+
+
+@lru_cache(maxsize=None)
+def get_settings():
+    """
+    Loads the .env file and returns the application settings.
+    The result is cached, so the file is parsed only once per process.
+
+    Returns:
+        AppSettings: The application settings.
+    """
+    load_dotenv("../.env")
+
+    return AppSettings(
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        openai_model=os.getenv("OPENAI_MODEL"),
+        qdrant_host=os.getenv("QDRANT_HOST"),
+        qdrant_api_key=os.getenv("QDRANT_API_KEY"),
+        collection_name=os.getenv("COLLECTION_NAME"),
+        pdf_path=os.getenv("PDF_PATH"),
+        pdf_folder=os.getenv("PDF_FOLDER"),
+        vector_size=int(os.getenv("VECTOR_SIZE")),
+    )
@@ -1,58 +1,74 @@
+import asyncio
 import logging
-import os
+import math
 
-from dotenv import load_dotenv
 from langchain.chains import RetrievalQA
-from langchain.chat_models import ChatOpenAI
-from langchain.agents import initialize_agent, Tool, AgentType
-
+from langchain.agents import AgentExecutor, create_openai_tools_agent
+from langchain_core.callbacks import StreamingStdOutCallbackHandler
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.tools import tool
+from langchain_openai import ChatOpenAI
+
+from config import get_settings
 from pdf_loader import PdfLoader
+from semantic_cache import SemanticCache
 from vector_database import VectorDatabase
 
 
-load_dotenv("../.env")
-
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
 
-def is_cat_obese(weight_kg: int) -> str:
+WEIGHT_TOOL_NAME = "cat_weight_tool"
+
+WEIGHT_STATUS_MESSAGES = (
+    "Кошка с весом {} кг имеет недостаточный вес. Рекомендуется проконсультироваться с ветеринаром.",
+    "Кошка с весом {} кг находится в пределах нормы.",
+    "Кошка с весом {} кг толстенькая. Рекомендуется проконсультироваться с ветеринаром.",
+)
+
+
+def is_cat_obese(weight_kg: float) -> str:
     """
     Determines the weight status of a cat (normal, underweight, or obese).
     
     :param weight_kg: Weight of the cat in kilograms.
     :return: Message describing the cat's weight status.
     """
+    weight = float(weight_kg)
+    if not math.isfinite(weight):
+        return "Ошибка: вес должен быть конечным числом (например, 4.5)."
+
+    status = (weight >= 3.5) + (weight > 5.5)
 
-    if float(weight_kg) < 3.5:
-        return f"Кошка с весом {weight_kg} кг имеет недостаточный вес. Рекомендуется проконсультироваться с ветеринаром."
-    elif 3.5 <= float(weight_kg) <= 5.5:
-        return f"Кошка с весом {weight_kg} кг находится в пределах нормы."
-    else:
-        return f"Кошка с весом {weight_kg} кг толстенькая. Рекомендуется проконсультироваться с ветеринаром."
+    return WEIGHT_STATUS_MESSAGES[status].format(weight_kg)
 
 
 def get_tools(qa_chain: RetrievalQA) -> list:
     """
     Creates a list of tools for the agent.
     
+    Tools are coroutines so the executor can run several tool calls
+    from one model step concurrently.
+
     :param qa_chain: The RetrievalQA chain for document retrieval.
     :return: List of tools.
     """
-    return [
-        Tool(
-            name="Document Retrieval",
-            func=lambda q: qa_chain({"query": q})["result"],
-            description="Retrieves information about cat and dog diseases from documents."
-        ),
-        Tool(
-            name="Cat Weight Tool",
-            func=is_cat_obese,
-            description="Determines if a cat's weight is within a healthy range."
-        )
-    ]
+    @tool("document_retrieval")
+    async def document_retrieval(query: str) -> str:
+        """Retrieves information about cat and dog diseases from documents."""
+        result = await qa_chain.ainvoke({"query": query})
+        return result["result"]
+
+    @tool(WEIGHT_TOOL_NAME)
+    async def cat_weight_tool(weight_kg: float) -> str:
+        """Determines if a cat's weight is within a healthy range."""
+        return is_cat_obese(weight_kg)
+
+    return [document_retrieval, cat_weight_tool]
 
 
 def get_agent_instructions() -> str:
@@ -70,22 +86,66 @@ def get_agent_instructions() -> str:
     )
 
 
-def initialize_custom_agent(llm, tools) -> any:
+def initialize_custom_agent(llm, tools, instructions: str) -> AgentExecutor:
     """
-    Initializes the agent with the specified tools and language model.
+    Initializes an OpenAI tools agent with the specified tools and language model.
+    The instructions are sent as the system message, a stable prefix that
+    OpenAI prompt caching can reuse across turns.
     
     :param llm: The language model to use.
     :param tools: List of tools for the agent.
-    :return: Initialized agent.
+    :param instructions: System instructions for the agent.
+    :return: Initialized agent executor.
     """
-    return initialize_agent(
+    prompt = ChatPromptTemplate.from_messages([
+        SystemMessage(content=instructions),
+        ("human", "{input}"),
+        MessagesPlaceholder(variable_name="agent_scratchpad"),
+    ])
+    agent = create_openai_tools_agent(llm, tools, prompt)
+
+    return AgentExecutor(
+        agent=agent,
         tools=tools,
-        llm=llm,
-        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-        verbose=True
+        verbose=True,
+        return_intermediate_steps=True
     )
 
 
+async def chat_loop(agent: AgentExecutor, cache: SemanticCache):
+    """
+    Reads user queries from stdin and answers them until 'e' is entered.
+
+    :param agent: The agent executor answering the queries.
+    :param cache: Semantic cache consulted before running the agent.
+    """
+    logger.info("Chatbot is ready! Enter a query (or type 'e' to quit):")
+    while True:
+        query = input("> ")
+        if query.lower() == "e":
+            break
+
+        try:
+            vector, answer = cache.lookup(query)
+            if answer is None:
+                response = await agent.ainvoke({"input": query})
+                answer = response["output"]
+
+                # Weight verdicts depend on the number in the query, which
+                # embedding similarity barely reflects, so they are not cached.
+                used_weight_tool = any(
+                    action.tool == WEIGHT_TOOL_NAME
+                    for action, _ in response["intermediate_steps"]
+                )
+                if not used_weight_tool:
+                    cache.update(vector, query, answer)
+
+            logger.info(f"Response: {answer}")
+
+        except Exception as e:
+            logger.error(f"Error during query execution: {e}")
+
+
 def main():
     try:
         logger.info("Initializing Qdrant...")
@@ -93,49 +153,51 @@ def main():
         vector_db = VectorDatabase()
         pdf_loader = PdfLoader()
 
-        model_name = os.getenv("OPENAI_MODEL")
+        settings = get_settings()
 
         try:
-            documents = pdf_loader.load_and_process_pdf()
-            retriever = vector_db.load_index(documents)
+            vectorstore = vector_db.load_index(pdf_loader.load_and_process_pdf)
         except Exception as e:
             raise Exception(f"Error occurred while loading index: {e}")
 
+        # Only the agent's replies are streamed to the user; the QA chain's
+        # intermediate answers are returned to the agent as tool output.
         llm = ChatOpenAI(
-            openai_api_key=os.getenv("OPENAI_API_KEY"),
-            model=model_name,
+            openai_api_key=settings.openai_api_key,
+            model=settings.openai_model,
+            temperature=0,
+            streaming=True,
+            callbacks=[StreamingStdOutCallbackHandler()]
+        )
+
+        qa_llm = ChatOpenAI(
+            openai_api_key=settings.openai_api_key,
+            model=settings.openai_model,
             temperature=0
         )
 
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=llm,
-            retriever=retriever.as_retriever(
-                search_type="similarity",
-                search_kwargs={"k": 5, "score_threshold": 0.5}
-            ),
-            return_source_documents=True
+        # score_threshold is applied by Qdrant during the search itself,
+        # so no client-side filtering of the retrieved documents is needed.
+        retriever = vectorstore.as_retriever(
+            search_type="similarity",
+            search_kwargs={
+                "k": 5,
+                "score_threshold": 0.5,
+                "search_params": vector_db.get_search_params()
+            }
         )
 
+        qa_chain = RetrievalQA.from_chain_type(llm=qa_llm, retriever=retriever)
+
         tools = get_tools(qa_chain)
 
         instructions = get_agent_instructions()
 
-        agent = initialize_custom_agent(llm, tools)
-
-        logger.info("Chatbot is ready! Enter a query (or type 'e' to quit):")
-        while True:
-            query = input("> ")
-            if query.lower() == "e":
-                break
-
-            try:
-                query_with_instructions = f"{instructions}\n{query}"
-                response = agent.run(query_with_instructions)
+        agent = initialize_custom_agent(llm, tools, instructions)
 
-                logger.info(f"Response: {response}")
+        cache = SemanticCache(vector_db)
 
-            except Exception as e:
-                logger.error(f"Error during query execution: {e}")
+        asyncio.run(chat_loop(agent, cache))
 
     except Exception as e:
         logger.critical(f"Critical error: {e}")
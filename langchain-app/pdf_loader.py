@@ -1,29 +1,70 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
 
-from dotenv import load_dotenv
-from langchain.document_loaders import PyPDFLoader
+import pymupdf
+from langchain_core.documents import Document
 
+from config import get_settings
+
+
+def extract_pages(file_path, page_numbers):
+    """
+    Extract the text of the given pages of a PDF file.
+    Runs in a worker process, so it opens its own handle to the file.
+
+    Args:
+        file_path (str): Path to the PDF file.
+        page_numbers (range): Zero-based numbers of the pages to extract.
+
+    Returns:
+        A list of documents, one per page.
+    """
+    with pymupdf.open(file_path) as pdf:
+        return [
+            Document(
+                page_content=pdf[page_number].get_text(),
+                metadata={
+                    "source": file_path,
+                    "page": page_number,
+                    "total_pages": pdf.page_count,
+                }
+            )
+            for page_number in page_numbers
+        ]
 
-load_dotenv("../.env")
 
 class PdfLoader:
     """
-    A class for loading and processing PDF files using PyPDFLoader.
+    A class for loading and processing PDF files using PyMuPDF.
     """
 
     def __init__(self):
         """
         Initialize the PDF loader. The file path is retrieved from the .env file.
         """
-        self.file_path = os.getenv("PDF_PATH")
+        self.file_path = get_settings().pdf_path
 
     def load_and_process_pdf(self):
         """
-        Load and process the PDF file. Uses PyPDFLoader to extract documents from the file.
+        Load and process the PDF file. Pages are split into contiguous ranges
+        and extracted in parallel, one range per worker process.
 
-        Returns: 
+        Returns:
             A list of documents extracted from the PDF file.
         """
-        loader = PyPDFLoader(self.file_path)
-        documents = loader.load()
+        with pymupdf.open(self.file_path) as pdf:
+            page_count = pdf.page_count
+
+        workers = min(os.cpu_count() or 1, page_count) or 1
+        step = max(1, -(-page_count // workers))
+        page_ranges = [
+            range(start, min(start + step, page_count))
+            for start in range(0, page_count, step)
+        ]
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = executor.map(
+                extract_pages, [self.file_path] * len(page_ranges), page_ranges
+                )
+            documents = [document for chunk in chunks for document in chunk]
         return documents
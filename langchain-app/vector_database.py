@@ -1,14 +1,23 @@
 import logging
-import os
+from functools import lru_cache
 
-from dotenv import load_dotenv
 from langchain_openai.embeddings import OpenAIEmbeddings
 from langchain_qdrant.vectorstores import Qdrant
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams
+from qdrant_client.http.models import (
+    Distance,
+    HnswConfigDiff,
+    OptimizersConfigDiff,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+)
 
+from config import get_settings
 
-load_dotenv("../.env")
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -16,60 +25,173 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=None)
+def get_embeddings():
+    """
+    Creates the embedding model on first use and returns the shared instance.
+    """
+    settings = get_settings()
+    return OpenAIEmbeddings(
+        openai_api_key=settings.openai_api_key,
+        model="text-embedding-3-small",
+        dimensions=settings.vector_size,
+        max_retries=10,
+        request_timeout=60)
+
+
 class VectorDatabase:
     """
     A class for managing vector operations with Qdrant.
     """
     def __init__(self):
-        self.qdrant_host = os.getenv("QDRANT_HOST")
-        self.collection_name = os.getenv("COLLECTION_NAME")
-        self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        self.qdrant_api_key = os.getenv("QDRANT_API_KEY")
-        self.vector_size = int(os.getenv("VECTOR_SIZE"))
-        self.embeddings = embeddings = OpenAIEmbeddings(
-                openai_api_key=self.openai_api_key,
-                model="text-embedding-ada-002")
+        settings = get_settings()
+        self.qdrant_host = settings.qdrant_host
+        self.collection_name = settings.collection_name
+        self.openai_api_key = settings.openai_api_key
+        self.qdrant_api_key = settings.qdrant_api_key
+        self.vector_size = settings.vector_size
+        self.embeddings = get_embeddings()
+        self._client = None
 
     def get_qdrant_client(self):
         """
-        Creates and returns a QdrantClient instance.
+        Returns the QdrantClient instance, creating it on first use
+        so that all methods share one connection.
+        """
+        if self._client is None:
+            self._client = QdrantClient(
+                url=self.qdrant_host,
+                api_key=self.qdrant_api_key,
+                prefer_grpc=True,
+                grpc_port=6334,
+                timeout=60
+                )
+        return self._client
+
+    def get_vectorstore(self):
+        """
+        Creates a Qdrant vector store for the collection
+        on top of the shared client and embedding model.
         """
-        return QdrantClient(url=self.qdrant_host, api_key=self.qdrant_api_key)
+        return Qdrant(
+            client=self.get_qdrant_client(),
+            collection_name=self.collection_name,
+            embeddings=self.embeddings)
 
-    def create_collection_if_not_exists(self, documents):
+    def get_search_params(self):
+        """
+        Returns the search parameters for queries against the collection.
+        The HNSW graph is walked with hnsw_ef=64 to find candidates on the
+        int8-quantized vectors, which are then rescored with the original
+        vectors to preserve recall.
+        """
+        return SearchParams(
+            hnsw_ef=64,
+            quantization=QuantizationSearchParams(
+                rescore=True,
+                oversampling=2.0
+            )
+        )
+
+    def check_vector_size(self):
+        """
+        Ensures the existing collection stores vectors of VECTOR_SIZE
+        dimensions, e.g. after the embedding model or VECTOR_SIZE changed.
+
+        Raises:
+            ValueError: If the collection was built with another size.
+        """
+        collection = self.get_qdrant_client().get_collection(self.collection_name)
+        size = getattr(collection.config.params.vectors, "size", None)
+        if size != self.vector_size:
+            raise ValueError(
+                f"Collection '{self.collection_name}' stores {size}-dimensional "
+                f"vectors, but VECTOR_SIZE is {self.vector_size}. Delete the "
+                f"collection to re-index it (see README, Migrating collections)."
+                )
+
+    def create_collection_if_not_exists(self, documents_fn):
         """
         Ensures the specified collection exists in Qdrant.
         Creates it if it doesnt exist.
+
+        Args:
+            documents_fn (callable): Returns the documents to be indexed.
+                Only called when the collection has to be created.
+
+        Returns:
+            Qdrant: The vector store used to index the documents,
+            or None if the collection already existed.
         """
         client = self.get_qdrant_client()
 
-        try:
-            client.get_collection(self.collection_name)
+        if client.collection_exists(self.collection_name):
+            self.check_vector_size()
             logger.info(f"Collection '{self.collection_name}' already exists.")
-        except Exception:
+            return None
+        else:
             logger.info(
                 f"Collection '{self.collection_name}' does not exist.Creating a new one..."
                 )
             try:
+                # Later runs skip ingestion for any existing collection, so
+                # one is only left behind once it has been fully indexed:
+                # documents are parsed first, and a failed index is dropped.
+                documents = documents_fn()
+
                 client.create_collection(
                     collection_name=self.collection_name,
                     vectors_config=VectorParams(
                         size=self.vector_size,
                         distance=Distance.COSINE
+                    ),
+                    hnsw_config=HnswConfigDiff(
+                        m=32,
+                        ef_construct=256,
+                        full_scan_threshold=10000
+                    ),
+                    optimizers_config=OptimizersConfigDiff(
+                        memmap_threshold=20000
+                    ),
+                    quantization_config=ScalarQuantization(
+                        scalar=ScalarQuantizationConfig(
+                            type=ScalarType.INT8,
+                            quantile=0.99,
+                            always_ram=True
+                        )
                     )
                 )
 
-                self.create_index(documents)
+                vectorstore = self.create_index(documents)
 
                 logger.info(
                     f"Collection '{self.collection_name}' successfully created."
                     )
+                return vectorstore
             except Exception as e:
                 logger.error(
                     f"Error creating collection '{self.collection_name}': {e}"
                     )
+                self.delete_incomplete_collection()
                 raise
 
+    def delete_incomplete_collection(self):
+        """
+        Deletes the collection after a failed ingestion, so the next run
+        indexes it again instead of serving a partial index.
+        """
+        client = self.get_qdrant_client()
+        try:
+            if client.collection_exists(self.collection_name):
+                client.delete_collection(self.collection_name)
+                logger.info(
+                    f"Incomplete collection '{self.collection_name}' deleted."
+                    )
+        except Exception as e:
+            logger.error(
+                f"Error deleting collection '{self.collection_name}': {e}"
+                )
+
     def create_index(self, documents):
         """
         Creates an index for the provided documents
@@ -83,17 +205,9 @@ class VectorDatabase:
             the indexed documents.
         """
         try:
-            client = self.get_qdrant_client()
-            self.create_collection_if_not_exists(documents)
-
             logger.info("Uploading documents to the collection...")
-            vectorstore = Qdrant.from_documents(
-                documents,
-                self.embeddings,
-                url=self.qdrant_host,
-                api_key=self.qdrant_api_key,
-                collection_name=self.collection_name
-            )
+            vectorstore = self.get_vectorstore()
+            vectorstore.add_documents(documents, batch_size=512)
 
             logger.info(
                 f"Index successfully created for collection '{self.collection_name}'."
@@ -103,25 +217,26 @@ class VectorDatabase:
             logger.error(f"Error creating index: {e}")
             raise
 
-    def load_index(self, documents):
+    def load_index(self, documents_fn):
         """
         Loads the existing index from the specified Qdrant collection.
+        The collection is created and indexed first if it doesnt exist.
+
+        Args:
+            documents_fn (callable): Returns the documents to be indexed.
+                Only called when the collection has to be created.
 
         Returns:
             Qdrant: An instance of the Qdrant vector store
             for the specified collection.
         """
         try:
-            client = self.get_qdrant_client()
-            self.create_collection_if_not_exists(documents)
+            vectorstore = self.create_collection_if_not_exists(documents_fn)
 
             logger.info(
                 f"Index loaded from collection '{self.collection_name}'."
                 )
-            return Qdrant(
-                client=client,
-                collection_name=self.collection_name,
-                embeddings=self.embeddings)
+            return vectorstore or self.get_vectorstore()
         except Exception as e:
             logger.error(f"Error loading index: {e}")
             raise
@@ -1,23 +1,32 @@
+import asyncio
 import logging
-import os
+import math
 
-from dotenv import load_dotenv
 from llama_index.llms.openai import OpenAI
 from llama_index.core.agent import ReActAgent
 from llama_index.core.tools import FunctionTool, QueryEngineTool, ToolMetadata
 
+from config import get_settings
 from pdf_loader import PdfLoader
+from semantic_cache import SemanticCache
 from vector_database import VectorDatabase
 
 
-load_dotenv("../.env")
-
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
 
+WEIGHT_TOOL_NAME = "Weight"
+
+WEIGHT_STATUS_MESSAGES = (
+    "A cat weighing {} kg is underweight. Consult a veterinarian.",
+    "A cat weighing {} kg is within the normal range.",
+    "A cat weighing {} kg is obese. Consult a veterinarian.",
+)
+
+
 def is_cat_obese(weight_kg: float) -> str:
     """
     Determines the weight status of a cat (normal, underweight, or obese).
@@ -30,12 +39,22 @@ def is_cat_obese(weight_kg: float) -> str:
     except ValueError:
         return "Error: Weight must be a valid number (e.g., 4.5)."
 
-    if weight_kg < 3.5:
-        return f"A cat weighing {weight_kg} kg is underweight. Consult a veterinarian."
-    elif 3.5 <= weight_kg <= 5.5:
-        return f"A cat weighing {weight_kg} kg is within the normal range."
-    else:
-        return f"A cat weighing {weight_kg} kg is obese. Consult a veterinarian."
+    if not math.isfinite(weight_kg):
+        return "Error: Weight must be a valid number (e.g., 4.5)."
+
+    status = (weight_kg >= 3.5) + (weight_kg > 5.5)
+
+    return WEIGHT_STATUS_MESSAGES[status].format(weight_kg)
+
+
+async def ais_cat_obese(weight_kg: float) -> str:
+    """
+    Async variant of is_cat_obese for use by the agent's async tool calls.
+
+    :param weight_kg: Weight of the cat in kilograms.
+    :return: Message describing the cat's weight status.
+    """
+    return is_cat_obese(weight_kg)
 
 
 def get_tools(index) -> list:
@@ -56,7 +75,7 @@ def get_tools(index) -> list:
         ),
 
         FunctionTool.from_defaults(
-        fn=is_cat_obese, name="Weight"
+        fn=is_cat_obese, async_fn=ais_cat_obese, name=WEIGHT_TOOL_NAME
         )
     ]
 
@@ -78,6 +97,47 @@ def get_agent_instructions() -> str:
     )
 
 
+async def chat_loop(agent: ReActAgent, cache: SemanticCache):
+    """
+    Reads user queries from stdin and answers them until 'e' is entered.
+
+    :param agent: The agent answering the queries.
+    :param cache: Semantic cache consulted before running the agent.
+    """
+    logger.info("Chatbot is ready! Enter a query (or type 'e' to quit):")
+    while True:
+        query = input("> ")
+        if query.lower() == "e":
+            break
+
+        try:
+            vector, answer = cache.lookup(query)
+            if answer is not None:
+                logger.info(f"Response: {answer}")
+                continue
+
+            # Every query is answered independently, as cached answers are.
+            agent.reset()
+            response = await agent.astream_chat(query)
+            async for token in response.async_response_gen():
+                print(token, end="", flush=True)
+            print()
+
+            # Weight verdicts depend on the number in the query, which
+            # embedding similarity barely reflects, so they are not cached.
+            used_weight_tool = any(
+                source.tool_name == WEIGHT_TOOL_NAME
+                for source in response.sources
+            )
+            if not used_weight_tool:
+                cache.update(vector, query, response.response)
+
+            logger.info(f"Response: {response.response}")
+
+        except Exception as e:
+            logger.error(f"Error during query execution: {e}")
+
+
 def main():
     try:
         logger.info("Initializing Qdrant...")
@@ -85,43 +145,38 @@ def main():
         vector_db = VectorDatabase()
         pdf_loader = PdfLoader()
 
-        pdf_path = os.getenv("PDF_PATH")
-        model_name = os.getenv("OPENAI_MODEL")
+        settings = get_settings()
 
         try:
-            documents = pdf_loader.load_and_process()
-            index = vector_db.load_index(documents)
+            index = vector_db.load_index(pdf_loader.load_and_process)
         except Exception as e:
             raise Exception(
                 f"Error occurred while loading index: {e}"
             )
 
-        llm = OpenAI(model=model_name, api_key=os.getenv("OPENAI_API_KEY"))
-
-        logger.info("Chatbot is ready! Enter a query (or type 'e' to quit):")
-        while True:
-            query = input("> ")
-            if query.lower() == "e":
-                break
-
-            try:
-                query_engine = index.as_query_engine(llm=llm, similarity_top_k=5)
+        llm = OpenAI(
+            model=settings.openai_model, api_key=settings.openai_api_key
+            )
 
-                tools = get_tools(query_engine)
-                instructions = get_agent_instructions()
+        query_engine = index.as_query_engine(
+            llm=llm,
+            similarity_top_k=5,
+            use_async=True,
+            vector_store_kwargs={"search_params": vector_db.get_search_params()}
+            )
 
-                agent = ReActAgent.from_tools(
-                    tools,
-                    llm=llm,
-                    verbose=True,
-                    system_prompt=instructions)
+        tools = get_tools(query_engine)
+        instructions = get_agent_instructions()
 
-                response = agent.chat(query)
+        agent = ReActAgent.from_tools(
+            tools,
+            llm=llm,
+            verbose=True,
+            system_prompt=instructions)
 
-                logger.info(f"Response: {response.response}")
+        cache = SemanticCache(vector_db)
 
-            except Exception as e:
-                logger.error(f"Error during query execution: {e}")
+        asyncio.run(chat_loop(agent, cache))
 
     except Exception as e:
         logger.critical(f"Critical error: {e}")
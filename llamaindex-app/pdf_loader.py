@@ -1,18 +1,17 @@
-import os
-
-from dotenv import load_dotenv
 from llama_index.core import Document, SimpleDirectoryReader
+from llama_index.readers.file import PyMuPDFReader
 
+from config import get_settings
 
-load_dotenv("../.env")
 
 class PdfLoader:
     """
-    A class for loading and processing PDF files using SimpleDirectoryReader.
+    A class for loading and processing PDF files using SimpleDirectoryReader
+    with PyMuPDFReader as the PDF parser.
     """
 
     def __init__(self):
-        self.file_path = os.getenv("PDF_FOLDER")
+        self.file_path = get_settings().pdf_folder
 
     def load_and_process(self):
         """
@@ -22,7 +21,10 @@ class PdfLoader:
             A list of Document objects containing the text of PDF pages.
         """
         try:
-            reader = SimpleDirectoryReader(input_dir=self.file_path)
+            reader = SimpleDirectoryReader(
+                input_dir=self.file_path,
+                file_extractor={".pdf": PyMuPDFReader()}
+            )
             documents = reader.load_data()
             return documents
         except Exception as e:
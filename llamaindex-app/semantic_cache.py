@@ -0,0 +1,113 @@
+import logging
+import uuid
+
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    A class for caching answers in Qdrant keyed on the question embedding,
+    so repeated or paraphrased questions skip retrieval and the LLM.
+    """
+    def __init__(self, vector_db, collection_name="semantic_cache",
+                 score_threshold=0.9):
+        self.client = vector_db.get_qdrant_client()
+        self.embeddings = vector_db.embeddings
+        self.vector_size = vector_db.vector_size
+        self.collection_name = collection_name
+        self.score_threshold = score_threshold
+        self.create_collection_if_not_exists()
+
+    def create_collection_if_not_exists(self):
+        """
+        Ensures the cache collection exists in Qdrant.
+        Creates it if it doesnt exist, and recreates it if it was built
+        with another vector size, as cached answers can always be dropped.
+        """
+        if self.client.collection_exists(self.collection_name):
+            collection = self.client.get_collection(self.collection_name)
+            size = getattr(collection.config.params.vectors, "size", None)
+            if size == self.vector_size:
+                return
+
+            logger.warning(
+                f"Cache collection '{self.collection_name}' stores {size}-dimensional "
+                f"vectors, but VECTOR_SIZE is {self.vector_size}. Recreating it..."
+                )
+            self.client.delete_collection(self.collection_name)
+
+        else:
+            logger.info(
+                f"Cache collection '{self.collection_name}' does not exist. Creating a new one..."
+                )
+
+        self.client.create_collection(
+            collection_name=self.collection_name,
+            vectors_config=VectorParams(
+                size=self.vector_size,
+                distance=Distance.COSINE
+            )
+        )
+
+    def lookup(self, query):
+        """
+        Searches the cache for an answer to a similar question.
+        The cache is best-effort: errors are logged and treated as a miss.
+
+        Args:
+            query (str): The user question.
+
+        Returns:
+            tuple: The question embedding (None if it couldnt be computed)
+            and the cached answer, or None as the answer on a cache miss.
+        """
+        vector = None
+        try:
+            vector = self.embeddings.get_query_embedding(query)
+            hits = self.client.query_points(
+                collection_name=self.collection_name,
+                query=vector,
+                limit=1,
+                score_threshold=self.score_threshold
+            ).points
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {e}")
+            return vector, None
+
+        if not hits:
+            return vector, None
+
+        logger.info(f"Semantic cache hit (score {hits[0].score:.3f}).")
+        return vector, hits[0].payload["answer"]
+
+    def update(self, vector, query, answer):
+        """
+        Stores an answer in the cache. Errors are logged and ignored.
+
+        Args:
+            vector (list): The question embedding returned by lookup.
+            query (str): The user question.
+            answer (str): The answer to cache.
+        """
+        if vector is None:
+            return
+
+        try:
+            self.client.upsert(
+                collection_name=self.collection_name,
+                points=[
+                    PointStruct(
+                        id=str(uuid.uuid4()),
+                        vector=vector,
+                        payload={"question": query, "answer": answer}
+                    )
+                ]
+            )
+        except Exception as e:
+            logger.warning(f"Semantic cache update failed: {e}")
@@ -1,27 +1,48 @@
+import asyncio
 import logging
-import os
+from functools import lru_cache
 
-from dotenv import load_dotenv
+import tiktoken
 from llama_index.core import Settings, VectorStoreIndex
-from llama_index.core.extractors import TitleExtractor
 from llama_index.core.ingestion import IngestionPipeline
-from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.node_parser import TokenTextSplitter
 from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.llms.openai import OpenAI
 from llama_index.vector_stores.qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.models import (
+    Distance,
+    HnswConfigDiff,
+    OptimizersConfigDiff,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+)
 
+from config import get_settings
 
-load_dotenv("../.env")
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
     )
 logger = logging.getLogger(__name__)
 
-Settings.llm = OpenAI(model=os.getenv("OPENAI_MODEL"))
-Settings.embed_model = OpenAIEmbedding(model="text-embedding-ada-002")
+
+@lru_cache(maxsize=None)
+def get_embeddings():
+    """
+    Creates the embedding model on first use and returns the shared instance.
+    """
+    settings = get_settings()
+    return OpenAIEmbedding(
+        api_key=settings.openai_api_key,
+        model="text-embedding-3-small",
+        dimensions=settings.vector_size,
+        num_workers=8
+        )
 
 
 class VectorDatabase:
@@ -29,42 +50,124 @@ class VectorDatabase:
     A class for managing vector operations with Qdrant using LlamaIndex.
     """
     def __init__(self):
-        self.qdrant_host = os.getenv("QDRANT_HOST")
-        self.collection_name = os.getenv("COLLECTION_NAME")
-        self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        self.qdrant_api_key = os.getenv("QDRANT_API_KEY")
-        self.vector_size = int(os.getenv("VECTOR_SIZE"))
-        self.embeddings = OpenAIEmbedding(
-                api_key=self.openai_api_key,
-                model="text-embedding-ada-002"
-                )
+        settings = get_settings()
+        self.qdrant_host = settings.qdrant_host
+        self.collection_name = settings.collection_name
+        self.openai_api_key = settings.openai_api_key
+        self.qdrant_api_key = settings.qdrant_api_key
+        self.vector_size = settings.vector_size
+        self.embeddings = get_embeddings()
+
+        Settings.llm = OpenAI(model=settings.openai_model)
+        Settings.embed_model = self.embeddings
+        self._client = None
 
     def get_qdrant_client(self):
         """
-        Creates and returns a QdrantClient instance.
+        Returns the QdrantClient instance, creating it on first use
+        so that all methods share one connection.
+        """
+        if self._client is None:
+            self._client = QdrantClient(
+                url=self.qdrant_host,
+                api_key=self.qdrant_api_key,
+                prefer_grpc=True,
+                grpc_port=6334,
+                timeout=60
+                )
+        return self._client
+
+    def get_async_qdrant_client(self):
+        """
+        Creates and returns an AsyncQdrantClient instance, used by the
+        vector store for async ingestion and queries. Unlike the sync
+        client it is not shared, as its connection is bound to the event
+        loop it is first used in.
         """
-        return QdrantClient(url=self.qdrant_host, api_key=self.qdrant_api_key)
+        return AsyncQdrantClient(
+            url=self.qdrant_host,
+            api_key=self.qdrant_api_key,
+            prefer_grpc=True,
+            grpc_port=6334,
+            timeout=60
+            )
+
+    def get_search_params(self):
+        """
+        Returns the search parameters for queries against the collection.
+        The HNSW graph is walked with hnsw_ef=64 to find candidates on the
+        int8-quantized vectors, which are then rescored with the original
+        vectors to preserve recall.
+        """
+        return SearchParams(
+            hnsw_ef=64,
+            quantization=QuantizationSearchParams(
+                rescore=True,
+                oversampling=2.0
+            )
+        )
 
-    def create_collection_if_not_exists(self, documents):
+    def check_vector_size(self):
+        """
+        Ensures the existing collection stores vectors of VECTOR_SIZE
+        dimensions, e.g. after the embedding model or VECTOR_SIZE changed.
+
+        Raises:
+            ValueError: If the collection was built with another size.
+        """
+        collection = self.get_qdrant_client().get_collection(self.collection_name)
+        size = getattr(collection.config.params.vectors, "size", None)
+        if size != self.vector_size:
+            raise ValueError(
+                f"Collection '{self.collection_name}' stores {size}-dimensional "
+                f"vectors, but VECTOR_SIZE is {self.vector_size}. Delete the "
+                f"collection to re-index it (see README, Migrating collections)."
+                )
+
+    def create_collection_if_not_exists(self, documents_fn):
         """
         Ensures the specified collection exists in Qdrant.
         Creates it if it doesnt exist.
+
+        Args:
+            documents_fn (callable): Returns the documents to be indexed.
+                Only called when the collection has to be created.
         """
         client = self.get_qdrant_client()
-        try:
-            client.get_collection(self.collection_name)
+        if client.collection_exists(self.collection_name):
+            self.check_vector_size()
             logger.info(f"Collection '{self.collection_name}' already exists.")
-        except Exception:
+        else:
             logger.info(
                 f"Collection '{self.collection_name}' does not exist. Creating a new one..."
                 )
 
             try:
+                # Later runs skip ingestion for any existing collection, so
+                # one is only left behind once it has been fully indexed:
+                # documents are parsed first, and a failed index is dropped.
+                documents = documents_fn()
+
                 client.create_collection(
                     collection_name=self.collection_name,
                     vectors_config=VectorParams(
                         size=self.vector_size,
                         distance=Distance.COSINE
+                    ),
+                    hnsw_config=HnswConfigDiff(
+                        m=32,
+                        ef_construct=256,
+                        full_scan_threshold=10000
+                    ),
+                    optimizers_config=OptimizersConfigDiff(
+                        memmap_threshold=20000
+                    ),
+                    quantization_config=ScalarQuantization(
+                        scalar=ScalarQuantizationConfig(
+                            type=ScalarType.INT8,
+                            quantile=0.99,
+                            always_ram=True
+                        )
                     )
                 )
                 
@@ -75,8 +178,26 @@ class VectorDatabase:
             except Exception as e:
                 logger.error(
                     f"Error creating collection '{self.collection_name}': {e}")
+                self.delete_incomplete_collection()
                 raise
 
+    def delete_incomplete_collection(self):
+        """
+        Deletes the collection after a failed ingestion, so the next run
+        indexes it again instead of serving a partial index.
+        """
+        client = self.get_qdrant_client()
+        try:
+            if client.collection_exists(self.collection_name):
+                client.delete_collection(self.collection_name)
+                logger.info(
+                    f"Incomplete collection '{self.collection_name}' deleted."
+                    )
+        except Exception as e:
+            logger.error(
+                f"Error deleting collection '{self.collection_name}': {e}"
+                )
+
     def create_index(self, documents):
         """
         Creates an index for the provided documents
@@ -93,22 +214,28 @@ class VectorDatabase:
             client = self.get_qdrant_client()
             vector_store = QdrantVectorStore(
                 client=client,
+                aclient=self.get_async_qdrant_client(),
                 collection_name=self.collection_name
                 )
 
-            self.create_collection_if_not_exists(documents)
-
             logger.info("Uploading documents to the collection...")
             pipeline = IngestionPipeline(
                 transformations=[
-                    SentenceSplitter(chunk_size=512, chunk_overlap=0),
-                    TitleExtractor(),
+                    TokenTextSplitter(
+                        chunk_size=512,
+                        chunk_overlap=64,
+                        tokenizer=tiktoken.encoding_for_model(
+                            "text-embedding-3-small"
+                            ).encode
+                    ),
                     self.embeddings,
                 ],
                 vector_store=vector_store,
             )
 
-            pipeline.run(documents=documents)
+            # A single process; the embedding model bounds concurrency to
+            # num_workers in-flight batch requests.
+            asyncio.run(pipeline.arun(documents=documents))
 
             index = VectorStoreIndex.from_vector_store(
                 llm=Settings.llm,
@@ -124,9 +251,14 @@ class VectorDatabase:
             logger.error(f"Error creating index: {e}")
             raise
 
-    def load_index(self, documents):
+    def load_index(self, documents_fn):
         """
         Loads the existing index from the specified Qdrant collection.
+        The collection is created and indexed first if it doesnt exist.
+
+        Args:
+            documents_fn (callable): Returns the documents to be indexed.
+                Only called when the collection has to be created.
 
         Returns:
             VectorStoreIndex: An instance of the VectorStoreIndex
@@ -136,10 +268,11 @@ class VectorDatabase:
             client = self.get_qdrant_client()
             vector_store = QdrantVectorStore(
                 client=client,
+                aclient=self.get_async_qdrant_client(),
                 collection_name=self.collection_name
                 )
 
-            self.create_collection_if_not_exists(documents)
+            self.create_collection_if_not_exists(documents_fn)
 
             logger.info(
                 f"Index loaded from collection '{self.collection_name}'."